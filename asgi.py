@@ -0,0 +1,332 @@
+"""ASGI entry point, e.g. ``uvicorn asgi:application --workers 4``.
+
+Anonymous GETs of the public read views (index, article, category and
+author pages) query the database through async SQLAlchemy, uploaded images
+are streamed from the event loop and cached pages are answered without
+leaving it, so slow clients and slow queries hold a coroutine instead of a
+worker thread. Everything else, including signed-in and authoring requests,
+runs as the regular WSGI app on a pool of ASGI_WSGI_THREADS threads.
+
+Needs uvicorn (or another ASGI server), a2wsgi and an async driver for the
+database: aiosqlite for SQLite, aiomysql for MySQL; all are pinned in
+requirements-asgi.txt. Run ``flask --app wsgi init-db`` before starting the
+workers.
+"""
+
+import asyncio
+import io
+import mimetypes
+import os
+import sys
+import time
+
+from a2wsgi import WSGIMiddleware
+from flask import abort, make_response, render_template, request, session
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import defer, joinedload, selectinload
+from werkzeug.exceptions import HTTPException
+
+from app import (
+    ARTICLE_CARD_OPTIONS,
+    ARTICLES_PER_PAGE,
+    NEWEST_FIRST,
+    PUBLISHED_TOTAL,
+    Articles,
+    Authors,
+    Category,
+    KeysetPage,
+    Profile,
+    cached_response,
+    create_app,
+    encode_cursor,
+    keyset_page,
+    page_cache,
+    page_cache_key,
+    page_is_cacheable,
+    request_seconds,
+    requested_upload,
+    requests_total,
+    seek_articles,
+    storage,
+    upload_etag,
+    upload_max_age,
+)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+mysqldb": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+}
+CHUNK_SIZE = 64 * 1024
+
+
+def async_database_url(app):
+    if app.config["ASYNC_DATABASE_URL"]:
+        return app.config["ASYNC_DATABASE_URL"]
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def wsgi_environ(scope):
+    """WSGI environ for a bodiless ASGI request, for app.request_context()."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin1"),
+        "PATH_INFO": scope["path"].encode().decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = value.decode("latin1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+# ASYNC VIEWS
+# Same queries and templates as the WSGI views in app.py; every relationship
+# a template touches must be loaded eagerly, as lazy loads cannot await.
+async def paginate_articles(db_session, total, **filters):
+    statement = (
+        select(Articles)
+        .options(*ARTICLE_CARD_OPTIONS)
+        .filter_by(**filters)
+        .order_by(*NEWEST_FIRST)
+    )
+    after = request.args.get("after")
+    before = request.args.get("before")
+    if after or before:
+        statement = seek_articles(statement, after, before)
+        items = await db_session.scalars(statement.limit(ARTICLES_PER_PAGE + 1))
+        return keyset_page(items.all(), total, after)
+
+    # Mirrors Flask-SQLAlchemy's paginate(): 404 past the last page
+    page = request.args.get("page", 1, type=int)
+    if page < 1:
+        abort(404)
+    items = await db_session.scalars(
+        statement.offset((page - 1) * ARTICLES_PER_PAGE).limit(ARTICLES_PER_PAGE)
+    )
+    items = items.all()
+    if not items and page != 1:
+        abort(404)
+    articles = KeysetPage(
+        items,
+        total,
+        has_prev=page > 1,
+        has_next=page * ARTICLES_PER_PAGE < total,
+        page=page,
+    )
+    articles.next_cursor = encode_cursor(items[-1]) if articles.has_next else None
+    return articles
+
+
+async def index(db_session):
+    total = await db_session.scalar(PUBLISHED_TOTAL) or 0
+    articles = await paginate_articles(db_session, total, is_published=True)
+    return render_template("index.html", articles=articles)
+
+
+async def article(db_session, article_slug):
+    article = await db_session.scalar(
+        select(Articles)
+        .options(
+            defer(Articles.content),
+            joinedload(Articles.category),
+            selectinload(Articles.images),
+        )
+        .filter_by(slug=article_slug)
+    )
+    if article is None:
+        abort(404)
+    return render_template("article.html", article=article)
+
+
+async def category(db_session, category_slug):
+    category = await db_session.scalar(select(Category).filter_by(slug=category_slug))
+    if category is None:
+        abort(404)
+    articles = await paginate_articles(
+        db_session,
+        category.published_count,
+        category_id=category.id,
+        is_published=True,
+    )
+    return render_template("category.html", category=category, articles=articles)
+
+
+async def author(db_session, username):
+    author = await db_session.scalar(select(Authors).filter_by(username=username))
+    if author is None:
+        abort(404)
+    profile = await db_session.scalar(
+        select(Profile)
+        .options(joinedload(Profile.author))
+        .filter_by(author_id=author.id)
+    )
+    articles = await paginate_articles(
+        db_session,
+        author.published_count,
+        author_id=author.id,
+        is_published=True,
+    )
+    return render_template(
+        "author.html", author=author, profile=profile, articles=articles
+    )
+
+
+ASYNC_VIEWS = {
+    "index": index,
+    "article": article,
+    "category": category,
+    "author": author,
+}
+
+
+class AsgiApp:
+    """Serves the async read paths itself and hands the rest to ``app``."""
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi = WSGIMiddleware(app, workers=app.config["ASGI_WSGI_THREADS"])
+        self.engine = None
+        self.sessions = None
+
+    def async_session(self):
+        # Created on first use so each server worker process gets its own pool
+        if self.engine is None:
+            self.engine = create_async_engine(
+                async_database_url(self.app),
+                **self.app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+            )
+            self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        return self.sessions()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.wsgi(scope, receive, send)
+
+        started = time.perf_counter()
+        environ = wsgi_environ(scope)
+        with self.app.request_context(environ):
+            endpoint = request.endpoint
+            path = None
+            # Routing errors and any session (signed in, flashed messages)
+            # take the WSGI path, so no sync user lookup runs on the loop
+            if request.routing_exception is not None or session:
+                response = None
+            elif endpoint == "uploaded_image":
+                response, path = self.upload_response(**request.view_args)
+            else:
+                response = await self.page_response(endpoint)
+        if response is None:
+            return await self.wsgi(scope, receive, send)
+
+        await self.send_response(send, response, environ, path)
+        if self.app.config["METRICS_ENABLED"]:
+            request_seconds.observe(time.perf_counter() - started, endpoint)
+            requests_total.inc(endpoint, str(response.status_code))
+
+    async def page_response(self, endpoint):
+        view = ASYNC_VIEWS.get(endpoint)
+        tags = getattr(self.app.view_functions[endpoint], "cache_tags", None)
+        cacheable = tags is not None and page_is_cacheable()
+        if cacheable:
+            path, page_tags = page_cache_key(tags, request.view_args)
+            cached = page_cache.get(path, page_tags)
+            if cached is not None:
+                return cached_response(cached)
+        if view is None:
+            return None
+        try:
+            async with self.async_session() as db_session:
+                response = make_response(await view(db_session, **request.view_args))
+        except HTTPException:
+            # Error pages are rendered by the WSGI app
+            return None
+        if cacheable:
+            if response.status_code == 200:
+                page_cache.set(path, page_tags, response)
+            response.headers["X-Cache"] = "MISS"
+        return response
+
+    def upload_response(self, post_slug, filename):
+        """Headers for a local upload and the file to stream, or (None, None)
+        for the WSGI view (X-Accel-Redirect and 404s)."""
+        if self.app.config["UPLOAD_ACCEL_REDIRECT"]:
+            return None, None
+        key, exact = requested_upload(filename)
+        if key is None:
+            return None, None
+        path = storage.path(key)
+        response = self.app.response_class(
+            mimetype=mimetypes.guess_type(key)[0] or "application/octet-stream"
+        )
+        response.set_etag(upload_etag(key))
+        response.cache_control.max_age = upload_max_age(exact)
+        response.cache_control.public = True
+        response.cache_control.immutable = exact
+        if request.if_none_match.contains(response.get_etag()[0]):
+            response.status_code = 304
+        else:
+            response.content_length = os.path.getsize(path)
+        return response, path
+
+    async def send_response(self, send, response, environ, path=None):
+        body = b"" if path else response.get_data()
+        headers = response.get_wsgi_headers(environ)
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": [
+                    (name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in headers.items()
+                ],
+            }
+        )
+        if environ["REQUEST_METHOD"] == "HEAD" or response.status_code != 200:
+            body, path = b"", None
+        if path is not None:
+            # Each chunk waits for the client to take the last one, so a
+            # slow download only ever holds this coroutine
+            with open(path, "rb") as f:
+                while chunk := await asyncio.to_thread(f.read, CHUNK_SIZE):
+                    await send(
+                        {"type": "http.response.body", "body": chunk, "more_body": True}
+                    )
+        await send({"type": "http.response.body", "body": body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.engine is not None:
+                    await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = AsgiApp(create_app())
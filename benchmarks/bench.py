@@ -0,0 +1,712 @@
+"""Load-test and benchmark harness for MysticWords.
+
+Seed a synthetic dataset, then drive the public and authoring paths either
+through the Flask test client (in-process) or over HTTP against a local
+server:
+
+    python benchmarks/bench.py seed --articles 10000
+    python benchmarks/bench.py run --articles 10000
+    python benchmarks/bench.py run --articles 10000 --http --concurrency 8
+    python benchmarks/bench.py run --articles 10000 --save-baseline
+    python benchmarks/bench.py capacity --articles 10000
+
+Each scale gets its own directory under benchmarks/data/ holding the
+database, uploads and job queue, so development data is never touched.
+Results are compared with benchmarks/baseline.json; a p95 latency or
+queries-per-request regression beyond the tolerance exits with status 1.
+
+``capacity`` starts the WSGI (gunicorn) and ASGI (uvicorn) deployments in
+turn, holds open a growing number of slow client connections and measures
+how article requests from other clients fare alongside them.
+"""
+
+import argparse
+import hashlib
+import http.client
+import io
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+BENCH_EMAIL = "author0@example.com"
+BENCH_PASSWORD = "benchmark"
+ENDPOINTS = ["index", "article", "category", "author", "signin", "create-article"]
+# Held slow connections per capacity level; each level stays well below
+# gunicorn's 30 second worker timeout
+CAPACITY_LEVELS = [0, 8, 32, 128]
+CAPACITY_SECONDS = 8
+# A slow client sends one more header line this often
+TRICKLE_INTERVAL = 0.5
+WORDS = (
+    "ancient river quiet garden morning winter city light market story music "
+    "journey mountain letter window harvest memory bridge forest ocean paper "
+    "silver engine theory voice island craft signal season school travel "
+    "kitchen border planet theatre canvas harbor valley rhythm lantern field"
+).split()
+# Smallest valid PNG (1x1, transparent), uploaded by create-article
+PNG_1X1 = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d4944415478da636460f85f0f0002870180eb47ba920000000049454e44ae426082"
+)
+
+
+def setup_environment(articles, page_cache=True):
+    """Point the app at the data directory for ``articles``; call before import."""
+    data_dir = os.path.join(BENCH_DIR, "data", str(articles))
+    os.makedirs(data_dir, exist_ok=True)
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(data_dir, "bench.sqlite")
+    os.environ["JOB_QUEUE_PATH"] = os.path.join(data_dir, "jobs.sqlite")
+    os.environ["PAGE_CACHE_TAGS_PATH"] = os.path.join(
+        data_dir, "page-cache-tags.sqlite"
+    )
+    os.environ["JOB_WORKERS"] = "0"
+    os.environ["METRICS_ENABLED"] = "1"
+    # Every benchmark sign-in comes from one client and account
+    os.environ["SIGNIN_ATTEMPTS_PER_IP"] = "0"
+    os.environ["SIGNIN_ATTEMPTS_PER_ACCOUNT"] = "0"
+    if not page_cache:
+        # Inherited by the server started for --http
+        os.environ["PAGE_CACHE_ENABLED"] = "0"
+    # UPLOAD_FOLDER is relative to the working directory
+    os.chdir(data_dir)
+    sys.path.insert(0, os.path.dirname(BENCH_DIR))
+    import app
+
+    return app
+
+
+# SEEDING
+def seed(app_module, articles, batch_size=5000):
+    """Insert ``articles`` synthetic articles, one author per 100 articles."""
+    app, db = app_module.app, app_module.db
+    Articles, Authors, Profile = (
+        app_module.Articles,
+        app_module.Authors,
+        app_module.Profile,
+    )
+    ArticleImages, Category = app_module.ArticleImages, app_module.Category
+    rng = random.Random(42)
+    with app.app_context():
+        app_module.init_db()
+        if db.session.scalar(db.select(db.func.count(Articles.id))):
+            print("Dataset already seeded.")
+            return
+        started = time.perf_counter()
+
+        # Authors and profiles share one password hash; author0 signs in
+        password = app_module.generate_password_hash(BENCH_PASSWORD)
+        author_count = max(1, articles // 100)
+        db.session.execute(
+            db.insert(Authors),
+            [
+                {
+                    "id": i + 1,
+                    "name": f"Author {i}",
+                    "username": f"author{i}",
+                    "email": f"author{i}@example.com",
+                    "password": password,
+                    "created_at": datetime.utcnow(),
+                }
+                for i in range(author_count)
+            ],
+        )
+        db.session.execute(
+            db.insert(Profile),
+            [
+                {"author_id": i + 1, "bio": f"Writer number {i}."}
+                for i in range(author_count)
+            ],
+        )
+        category_ids = db.session.scalars(db.select(Category.id)).all()
+
+        # Every article shows the same stored image
+        sha256 = hashlib.sha256(PNG_1X1).hexdigest()
+        image_key = app_module.upload_key(sha256, "png")
+        if not app_module.storage.exists(image_key):
+            with tempfile.NamedTemporaryFile(dir=app_module.upload_tmp_dir()) as f:
+                f.write(PNG_1X1)
+                f.flush()
+                app_module.storage.put_file(image_key, f.name)
+            app_module.make_image_variants(image_key)
+
+        # A handful of bodies, summarized and rendered once
+        bodies = []
+        for _ in range(20):
+            content = "\n\n".join(
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 90)))
+                for _ in range(rng.randint(2, 5))
+            )
+            excerpt, word_count, reading_time = app_module.summarize(content)
+            bodies.append(
+                {
+                    "content": content,
+                    "excerpt": excerpt,
+                    "word_count": word_count,
+                    "reading_time": reading_time,
+                    "content_html": app_module.render_content_html(content),
+                    "content_hash": app_module.content_hash(content),
+                }
+            )
+
+        newest = datetime.utcnow()
+        for start in range(0, articles, batch_size):
+            rows, images = [], []
+            for i in range(start, min(start + batch_size, articles)):
+                title = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {i}"
+                rows.append(
+                    {
+                        "id": i + 1,
+                        "title": title,
+                        "slug": app_module.slugify(title),
+                        "is_published": i % 10 != 0,
+                        "date_posted": newest - timedelta(minutes=i),
+                        "category_id": category_ids[i % len(category_ids)],
+                        "author_id": rng.randint(1, author_count),
+                        **bodies[i % len(bodies)],
+                    }
+                )
+                images.append(
+                    {"filename": image_key, "content_hash": sha256, "article_id": i + 1}
+                )
+            db.session.execute(db.insert(Articles), rows)
+            db.session.execute(db.insert(ArticleImages), images)
+            db.session.commit()
+            print(f"  {start + len(rows)}/{articles} articles", end="\r", flush=True)
+        print()
+        app_module.repair_counters()
+        app_module.rebuild_search_index()
+        print(f"Seeded {articles} articles in {time.perf_counter() - started:.1f}s.")
+
+
+def load_targets(app_module, sample=1000):
+    """Random published slugs, category slugs and usernames to request."""
+    app, db = app_module.app, app_module.db
+    Articles, Authors = app_module.Articles, app_module.Authors
+    with app.app_context():
+        slugs = db.session.scalars(
+            db.select(Articles.slug)
+            .filter_by(is_published=True)
+            .order_by(db.func.random())
+            .limit(sample)
+        ).all()
+        categories = db.session.scalars(
+            db.select(app_module.Category.slug).where(
+                app_module.Category.published_count > 0
+            )
+        ).all()
+        usernames = db.session.scalars(
+            db.select(Authors.username).order_by(db.func.random()).limit(sample)
+        ).all()
+    if not slugs:
+        sys.exit("No articles found; run `bench.py seed` first.")
+    return {"slugs": slugs, "categories": categories, "usernames": usernames}
+
+
+def make_request(endpoint, targets, rng):
+    """``(method, path, form, files)`` for one request to ``endpoint``."""
+    if endpoint == "index":
+        return "GET", f"/?page={rng.randint(1, 5)}", None, None
+    if endpoint == "article":
+        return "GET", f"/article/{rng.choice(targets['slugs'])}/", None, None
+    if endpoint == "category":
+        return "GET", f"/category/{rng.choice(targets['categories'])}/", None, None
+    if endpoint == "author":
+        return "GET", f"/author/{rng.choice(targets['usernames'])}/", None, None
+    if endpoint == "signin":
+        form = {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+        return "POST", "/signin", form, None
+    if endpoint == "create-article":
+        form = {
+            "title": f"Benchmark {uuid.uuid4().hex[:12]}",
+            "content": " ".join(rng.choice(WORDS) for _ in range(200)),
+            "category": rng.choice(targets["categories"]),
+            "is_published": "1",
+        }
+        return "POST", "/profile/create-article", form, {"images": PNG_1X1}
+    raise ValueError(endpoint)
+
+
+# DRIVERS
+class TestClientDriver:
+    """Requests through app.test_client(), in this process."""
+
+    name = "client"
+
+    def __init__(self, app_module):
+        self.app = app_module.app
+        self.app.config["TESTING"] = True
+
+    def session(self, endpoint):
+        # Only the sign-in cookie is kept, so flashed messages do not pile up
+        session = {"client": self.app.test_client(use_cookies=False), "cookie": None}
+        if endpoint == "create-article":
+            response = session["client"].post(
+                "/signin", data={"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+            )
+            session["cookie"] = session_cookie(response.headers.getlist("Set-Cookie"))
+        return session
+
+    def send(self, session, method, path, form, files):
+        data = dict(form or {})
+        for field, content in (files or {}).items():
+            data[field] = (io.BytesIO(content), "image.png")
+        headers = {"Cookie": session["cookie"]} if session["cookie"] else {}
+        response = session["client"].open(
+            path, method=method, data=data or None, headers=headers
+        )
+        return response.status_code, response.headers.get("X-Cache")
+
+    def metrics(self):
+        return self.app.test_client().get("/metrics").get_data(as_text=True)
+
+
+class HTTPDriver:
+    """Requests over HTTP, one connection per request."""
+
+    name = "http"
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+
+    def _request(self, method, path, body=None, headers=None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            response.read()
+            return response
+        finally:
+            conn.close()
+
+    def session(self, endpoint):
+        session = {"cookie": None}
+        if endpoint == "create-article":
+            response = self._request(
+                "POST",
+                "/signin",
+                urlencode({"email": BENCH_EMAIL, "password": BENCH_PASSWORD}),
+                {"Content-Type": "application/x-www-form-urlencoded"},
+            )
+            session["cookie"] = session_cookie(response.headers.get_all("Set-Cookie"))
+        return session
+
+    def send(self, session, method, path, form, files):
+        headers = {}
+        body = None
+        if files:
+            body, headers["Content-Type"] = encode_multipart(form, files)
+        elif form:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if session["cookie"]:
+            headers["Cookie"] = session["cookie"]
+        response = self._request(method, path, body, headers)
+        return response.status, response.getheader("X-Cache")
+
+    def metrics(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            conn.request("GET", "/metrics")
+            return conn.getresponse().read().decode()
+        finally:
+            conn.close()
+
+
+def session_cookie(set_cookie_headers):
+    for header in set_cookie_headers or []:
+        cookie = SimpleCookie(header).get("session")
+        if cookie:
+            return f"session={cookie.value}"
+    return None
+
+
+def encode_multipart(form, files):
+    boundary = uuid.uuid4().hex
+    lines = []
+    for name, value in form.items():
+        lines.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"'
+            f"\r\n\r\n{value}\r\n".encode()
+        )
+    for name, content in files.items():
+        lines.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; '
+            f'filename="image.png"\r\nContent-Type: image/png\r\n\r\n'.encode()
+            + content
+            + b"\r\n"
+        )
+    lines.append(f"--{boundary}--\r\n".encode())
+    return b"".join(lines), f"multipart/form-data; boundary={boundary}"
+
+
+def query_totals(metrics_text):
+    """``{endpoint: (sum, count)}`` of mysticwords_request_queries."""
+    totals = {}
+    pattern = r'mysticwords_request_queries_(sum|count)\{endpoint="([^"]+)"\} (\S+)'
+    for kind, endpoint, value in re.findall(pattern, metrics_text):
+        pair = totals.setdefault(endpoint, [0.0, 0.0])
+        pair[kind == "count"] = float(value)
+    return totals
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank percentile
+    index = max(0, -(-len(sorted_values) * pct // 100) - 1)
+    return sorted_values[int(index)]
+
+
+def run_endpoint(driver, endpoint, targets, requests, concurrency, seed):
+    """Run ``requests`` requests against ``endpoint``; return its summary."""
+    before = query_totals(driver.metrics()).get(endpoint, [0.0, 0.0])
+    latencies, statuses, hits = [], {}, 0
+    lock = threading.Lock()
+    per_worker = [requests // concurrency] * concurrency
+    for i in range(requests % concurrency):
+        per_worker[i] += 1
+
+    def worker(count, worker_seed):
+        nonlocal hits
+        rng = random.Random(worker_seed)
+        session = driver.session(endpoint)
+        for _ in range(count):
+            method, path, form, files = make_request(endpoint, targets, rng)
+            started = time.perf_counter()
+            status, cache = driver.send(session, method, path, form, files)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+                hits += cache == "HIT"
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, args=(count, seed + i))
+        for i, count in enumerate(per_worker)
+        if count
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    after = query_totals(driver.metrics()).get(endpoint, [0.0, 0.0])
+    counted = after[1] - before[1]
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "queries": round((after[0] - before[0]) / counted, 1) if counted else None,
+        "cache_hits": hits,
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+    }
+
+
+def wait_for_port(process, port):
+    """Return ``process`` once it accepts connections on ``port``."""
+    deadline = time.time() + 30
+    while time.time() < deadline and process.poll() is None:
+        try:
+            http.client.HTTPConnection("127.0.0.1", port, timeout=1).connect()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    sys.exit("Benchmark server did not start.")
+
+
+def start_server(articles, port):
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "serve"]
+        + ["--articles", str(articles), "--port", str(port)]
+    )
+    return wait_for_port(process, port)
+
+
+# CAPACITY
+def capacity_command(server, port, workers):
+    """Command line for the ``wsgi`` or ``asgi`` deployment, run from the data dir."""
+    root = os.path.dirname(BENCH_DIR)
+    if server == "wsgi":
+        command = ["gunicorn", "--pythonpath", root, "--bind", f"127.0.0.1:{port}"]
+    else:
+        command = ["uvicorn", "--app-dir", root, "--port", str(port)]
+    command += ["--workers", str(workers), "--log-level", "warning"]
+    return [sys.executable, "-m", *command, f"{server}:application"]
+
+
+def hold_connections(port, count, stop):
+    """Keep ``count`` clients mid-request, trickling headers until ``stop``."""
+    held = []
+    for _ in range(count):
+        try:
+            sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+            sock.sendall(b"GET / HTTP/1.1\r\nHost: 127.0.0.1\r\n")
+            held.append(sock)
+        except OSError:
+            break
+    while not stop.wait(TRICKLE_INTERVAL):
+        for sock in held:
+            try:
+                sock.sendall(b"X-Slow-Client: 1\r\n")
+            except OSError:
+                pass
+    for sock in held:
+        sock.close()
+
+
+def measure_capacity(port, held, targets, concurrency, seed):
+    """Article latency and failures with ``held`` slow connections open."""
+    stop = threading.Event()
+    holder = threading.Thread(target=hold_connections, args=(port, held, stop))
+    holder.start()
+    # Let the slow clients occupy the server before probing
+    time.sleep(1)
+    latencies, failed = [], 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + CAPACITY_SECONDS
+
+    def worker(worker_seed):
+        nonlocal failed
+        rng = random.Random(worker_seed)
+        while time.perf_counter() < deadline:
+            path = f"/article/{rng.choice(targets['slugs'])}/"
+            started = time.perf_counter()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            try:
+                conn.request("GET", path)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                ok = False
+            finally:
+                conn.close()
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    failed += 1
+
+    threads = [
+        threading.Thread(target=worker, args=(seed + i,)) for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    holder.join()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / CAPACITY_SECONDS, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if latencies else None,
+        "failed": failed,
+    }
+
+
+def run_capacity(targets, port, workers, concurrency, seed):
+    """``{(server, held): summary}`` for both deployments."""
+    results = {}
+    for server in ("wsgi", "asgi"):
+        process = subprocess.Popen(capacity_command(server, port, workers))
+        try:
+            wait_for_port(process, port)
+            # Fill each worker's page cache so every level sees the same hit rate
+            driver = HTTPDriver(f"http://127.0.0.1:{port}")
+            for slug in targets["slugs"] * workers:
+                driver.send({"cookie": None}, "GET", f"/article/{slug}/", None, None)
+            for held in CAPACITY_LEVELS:
+                results[server, held] = measure_capacity(
+                    port, held, targets, concurrency, seed
+                )
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+def print_capacity(results):
+    print(
+        f"{'server':<8}{'held':>6}{'reqs':>7}{'req/s':>9}{'p50 ms':>10}{'p99 ms':>10}{'failed':>8}"
+    )
+    for (server, held), r in results.items():
+        p50 = "-" if r["p50_ms"] is None else r["p50_ms"]
+        p99 = "-" if r["p99_ms"] is None else r["p99_ms"]
+        print(
+            f"{server:<8}{held:>6}{r['requests']:>7}{r['rps']:>9}{p50:>10}"
+            f"{p99:>10}{r['failed']:>8}"
+        )
+
+
+def compare(results, baseline, tolerance):
+    """Print regressions against ``baseline``; True if there were any."""
+    regressed = False
+    for endpoint, result in results.items():
+        expected = baseline.get(endpoint)
+        if not expected:
+            continue
+        if result["p95_ms"] > expected["p95_ms"] * (1 + tolerance):
+            print(
+                f"REGRESSION {endpoint}: p95 {result['p95_ms']}ms "
+                f"(baseline {expected['p95_ms']}ms)"
+            )
+            regressed = True
+        if (
+            result["queries"] is not None
+            and expected.get("queries") is not None
+            and result["queries"] > expected["queries"]
+        ):
+            print(
+                f"REGRESSION {endpoint}: {result['queries']} queries/request "
+                f"(baseline {expected['queries']})"
+            )
+            regressed = True
+    return regressed
+
+
+def print_results(results):
+    print(
+        f"{'endpoint':<16}{'reqs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+        f"{'p99 ms':>9}{'queries':>9}{'hits':>6}  statuses"
+    )
+    for endpoint, r in results.items():
+        queries = "-" if r["queries"] is None else r["queries"]
+        print(
+            f"{endpoint:<16}{r['requests']:>6}{r['rps']:>9}{r['p50_ms']:>9}"
+            f"{r['p95_ms']:>9}{r['p99_ms']:>9}{queries:>9}{r['cache_hits']:>6}"
+            f"  {r['statuses']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    seed_parser = commands.add_parser("seed", help="create the synthetic dataset")
+    run_parser = commands.add_parser("run", help="benchmark the endpoints")
+    serve_parser = commands.add_parser("serve", help="serve the dataset over HTTP")
+    capacity_parser = commands.add_parser(
+        "capacity", help="compare WSGI and ASGI under slow client connections"
+    )
+    for command in (seed_parser, run_parser, serve_parser, capacity_parser):
+        command.add_argument("--articles", type=int, default=10000)
+    seed_parser.add_argument("--batch-size", type=int, default=5000)
+    serve_parser.add_argument("--port", type=int, default=5055)
+    run_parser.add_argument("--endpoints", nargs="+", default=ENDPOINTS)
+    run_parser.add_argument("--requests", type=int, default=200)
+    run_parser.add_argument("--concurrency", type=int, default=1)
+    run_parser.add_argument(
+        "--http", action="store_true", help="start a local server and load it"
+    )
+    run_parser.add_argument(
+        "--url", help="load an already running server, e.g. gunicorn on the data"
+    )
+    run_parser.add_argument("--port", type=int, default=5055)
+    run_parser.add_argument(
+        "--no-page-cache",
+        action="store_true",
+        help="render every page instead of serving anonymous reads from cache",
+    )
+    run_parser.add_argument("--seed", type=int, default=1)
+    capacity_parser.add_argument("--port", type=int, default=5056)
+    capacity_parser.add_argument("--workers", type=int, default=4)
+    capacity_parser.add_argument("--concurrency", type=int, default=4)
+    capacity_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--tolerance", type=float, default=0.25)
+    run_parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    app_module = setup_environment(
+        args.articles, not getattr(args, "no_page_cache", False)
+    )
+    if args.command == "seed":
+        seed(app_module, args.articles, args.batch_size)
+        return
+    if args.command == "serve":
+        import logging
+
+        from werkzeug.serving import make_server
+
+        # Per-request access logs would dominate the load generator's output
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+        make_server(
+            "127.0.0.1", args.port, app_module.app, threaded=True
+        ).serve_forever()
+        return
+
+    targets = load_targets(app_module)
+    if args.command == "capacity":
+        print_capacity(
+            run_capacity(
+                targets,
+                args.port,
+                args.workers,
+                args.concurrency,
+                args.seed,
+            )
+        )
+        return
+    server = None
+    if args.url or args.http:
+        if not args.url:
+            server = start_server(args.articles, args.port)
+        driver = HTTPDriver(args.url or f"http://127.0.0.1:{args.port}")
+    else:
+        driver = TestClientDriver(app_module)
+    try:
+        results = {
+            endpoint: run_endpoint(
+                driver, endpoint, targets, args.requests, args.concurrency, args.seed
+            )
+            for endpoint in args.endpoints
+        }
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print_results(results)
+
+    key = f"{driver.name}-{args.articles}-c{args.concurrency}"
+    if args.no_page_cache:
+        key += "-nocache"
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+    if args.save_baseline:
+        baselines[key] = results
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline {key}.")
+    elif key in baselines:
+        if compare(results, baselines[key], args.tolerance):
+            sys.exit(1)
+        print(f"No regressions against baseline {key}.")
+    else:
+        print(f"No baseline for {key}; record one with --save-baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Listing views stay within their QUERY_BUDGETS on a seeded database.
+
+Run from the repository root with ``python -m pytest -q``.
+"""
+
+import importlib
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# More than a page, so every listing has a next page and a COUNT to answer
+ARTICLES = 25
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    """The app on a fresh SQLite database; configured before the import."""
+    data_dir = tmp_path_factory.mktemp("data")
+    os.environ["DATABASE_URL"] = f"sqlite:///{data_dir / 'test.sqlite'}"
+    os.environ["JOB_QUEUE_PATH"] = str(data_dir / "jobs.sqlite")
+    os.environ["PAGE_CACHE_TAGS_PATH"] = str(data_dir / "page-cache-tags.sqlite")
+    os.environ["JOB_WORKERS"] = "0"
+    # Cached pages run no queries at all
+    os.environ["PAGE_CACHE_ENABLED"] = "0"
+    # UPLOAD_FOLDER is relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(data_dir)
+    sys.path.insert(0, REPO_DIR)
+    try:
+        app_module = importlib.import_module("app")
+        app_module.app.config["TESTING"] = True
+        seed(app_module)
+        yield app_module
+    finally:
+        os.chdir(cwd)
+
+
+def seed(app_module):
+    """One author with ARTICLES published articles, all in one category."""
+    app, db = app_module.app, app_module.db
+    with app.app_context():
+        app_module.init_db()
+        author = app_module.Authors(
+            name="Budget Author",
+            username="budget",
+            email="budget@example.com",
+            password="unused",
+        )
+        db.session.add(author)
+        db.session.flush()
+        db.session.add(app_module.Profile(author_id=author.id, bio="Counts queries."))
+        category_id = db.session.scalars(db.select(app_module.Category.id)).first()
+
+        content = "Some words to read.\n\nAnd a second paragraph."
+        excerpt, word_count, reading_time = app_module.summarize(content)
+        newest = datetime.utcnow()
+        db.session.execute(
+            db.insert(app_module.Articles),
+            [
+                {
+                    "id": i + 1,
+                    "title": f"Budget article {i}",
+                    "slug": f"budget-article-{i}",
+                    "content": content,
+                    "excerpt": excerpt,
+                    "word_count": word_count,
+                    "reading_time": reading_time,
+                    "content_html": app_module.render_content_html(content),
+                    "content_hash": app_module.content_hash(content),
+                    "is_published": True,
+                    "date_posted": newest - timedelta(minutes=i),
+                    "category_id": category_id,
+                    "author_id": author.id,
+                }
+                for i in range(ARTICLES)
+            ],
+        )
+        db.session.execute(
+            db.insert(app_module.ArticleImages),
+            [
+                {"filename": f"budget-{i}.png", "article_id": i + 1}
+                for i in range(ARTICLES)
+            ],
+        )
+        db.session.commit()
+        app_module.repair_counters()
+
+
+def listing_urls(app_module):
+    app, db = app_module.app, app_module.db
+    with app.app_context():
+        category_slug = db.session.scalar(
+            db.select(app_module.Category.slug).join(app_module.Articles).limit(1)
+        )
+    return {
+        "index": ["/", "/?page=2"],
+        "category": [
+            f"/category/{category_slug}/",
+            f"/category/{category_slug}/?page=2",
+        ],
+        "author": ["/author/budget/", "/author/budget/?page=2"],
+        "profile": ["/profile/", "/profile/?page=2"],
+    }
+
+
+def count_queries(client, url):
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert response.status_code == 200, url
+    return queries
+
+
+@pytest.mark.parametrize("endpoint", ["index", "category", "author", "profile"])
+def test_listing_query_budget(app_module, endpoint):
+    client = app_module.app.test_client()
+    if endpoint == "profile":
+        with app_module.app.app_context():
+            author_id = app_module.db.session.scalar(
+                app_module.db.select(app_module.Authors.id).filter_by(username="budget")
+            )
+        with client.session_transaction() as session:
+            session["_user_id"] = str(author_id)
+            session["_fresh"] = True
+    budget = app_module.QUERY_BUDGETS[endpoint]
+    for url in listing_urls(app_module)[endpoint]:
+        # The first request also runs one-off lookups (site settings, search
+        # backend); the budget is for the steady state after it
+        client.get(url)
+        queries = count_queries(client, url)
+        assert (
+            len(queries) <= budget
+        ), f"{url} ran {len(queries)} queries (budget {budget}):\n" + "\n".join(queries)
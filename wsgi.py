@@ -0,0 +1,8 @@
+"""WSGI entry point, e.g. ``gunicorn --workers 4 wsgi:application``.
+
+Run ``flask --app wsgi init-db`` before starting the workers.
+"""
+
+from app import create_app
+
+application = create_app()